@@ -14,106 +14,247 @@ This script purifies HTML content for data extraction by removing:
 - Link tags (anchor text is preserved)
 
 The script preserves semantic HTML structure and data content.
+
+When lxml is installed the document is parsed and cleaned with libxml2, which
+is much faster on large inputs; otherwise the pure-Python html.parser based
+HTMLCleaner is used.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 from html.parser import HTMLParser
+import codecs
+import contextlib
+import glob
+import os
+import stat
 import sys
 import html
+import io
+import re
+
+try:
+    import cython
+except ImportError:  # Cython is optional, the declarations below are no-ops without it
+    class cython:
+        """Stand-in for Cython's pure-Python mode helpers."""
+        
+        compiled = False
+        bint = bool
+        
+        @staticmethod
+        def declare(type_, value=None):
+            return value
+        
+        @staticmethod
+        def locals(**types):
+            return lambda func: func
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml is optional, fall back to html.parser
+    etree = None
+    lxml_html = None
+
+
+# Size of the chunks input files are read and parsed in
+CHUNK_SIZE = 64 * 1024
+
+# Tags that should be removed if empty
+# Keep structural tags like html, head, body even if empty
+REMOVABLE_EMPTY_TAGS = ('div', 'span', 'p', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+                        'section', 'article', 'aside', 'main', 'figure', 'figcaption',
+                        'strong', 'em', 'b', 'i', 'u', 'small', 'mark', 'del', 'ins',
+                        'sub', 'sup', 'blockquote', 'pre', 'code', 'kbd', 'samp', 'var',
+                        'abbr', 'address', 'cite', 'dfn', 'time', 'dd', 'dt', 'dl')
+
+# Matches documents (as opposed to fragments) so lxml output keeps the same shape.
+# A document may start with a byte order mark, whitespace and comments; its
+# first tag is matched from where that prefix ends.
+_DOCUMENT_PREFIX_RE = re.compile(r'(?:\ufeff|\s|<!--.*?-->)*', re.DOTALL)
+_DOCUMENT_TAG_RE = re.compile(r'<(?:!doctype|html|head|body)\b', re.IGNORECASE)
+_DOCTYPE_RE = re.compile(r'<!doctype', re.IGNORECASE)
+
+# Characters of the input kept to find its first tag; input still inside its
+# leading whitespace and comments after this many is cleaned as a fragment
+_DOCUMENT_START_LIMIT = 256 * 1024
+
+# Tag names used to mark elements for lxml's C-level strip_tags/strip_elements.
+# lxml.html's drop_tag/drop_tree reassign text in Python, which lxml rejects
+# for text containing control characters.
+_LXML_UNWRAP_MARKER = 'html-cleaner-unwrap'
+_LXML_DROP_MARKER = 'html-cleaner-drop'
+
+# Used by remove_empty_tags only: empty removable tag, e.g. <p></p> or <div class="x">\n</div>
+_EMPTY_TAG_RE = re.compile(
+    r'<(' + '|'.join(map(re.escape, REMOVABLE_EMPTY_TAGS)) + r')\b[^>]*>\s*</\1\s*>')
+
+# Closing tag alone on its line
+_ORPHAN_CLOSING_TAG_RE = re.compile(r'^\s*</[^>]+>\s*$', re.MULTILINE)
+
+# Characters str.splitlines() treats as line boundaries
+_LINE_BREAKS = r'\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029'
+
+# Single scanner for format_html. Output lines are the pieces of the document
+# split at line breaks, after '>' not followed by '<' and before '<' not
+# preceded by '>'. Group 1 matches one such piece unless it is blank; the other
+# alternatives consume blank pieces (and the line break ending them) in one step
+# so the scanner never retries inside runs of indentation.
+_LINE_TEXT = rf'[^<>{_LINE_BREAKS}]*'
+_LINE_SPACE = rf'[^\S{_LINE_BREAKS}]'
+_LINE_RE = re.compile(
+    rf'((?:<|{_LINE_SPACE}*[^\s<>]){_LINE_TEXT}(?:><{_LINE_TEXT})*>?'
+    rf'|{_LINE_SPACE}*>(?:<{_LINE_TEXT}(?:><{_LINE_TEXT})*>?)?)'
+    rf'|{_LINE_SPACE}*[{_LINE_BREAKS}]|{_LINE_SPACE}+'
+)
+_MULTIPLE_SPACES_RE = re.compile(r'  +')
+
+# Tag sets used by HTMLCleaner. They live at module level as frozensets so
+# that a Cython build compiles them to C globals with direct hash lookups.
+
+# Media tags that are self-closing
+_SELF_CLOSING_MEDIA_TAGS = cython.declare(frozenset, frozenset({'img', 'source', 'track', 'embed'}))
+
+# Media tags that typically have content (not self-closing)
+_MEDIA_TAGS_WITH_CONTENT = cython.declare(frozenset, frozenset({'video', 'audio', 'iframe', 'object', 'svg', 'canvas'}))
+
+# Media tags to remove (both self-closing and with content)
+_MEDIA_TAGS = cython.declare(frozenset, _SELF_CLOSING_MEDIA_TAGS | _MEDIA_TAGS_WITH_CONTENT)
+
+# Tags that should be removed along with their content
+_REMOVE_WITH_CONTENT = cython.declare(frozenset, frozenset({'style', 'script', 'noscript'}))
+
+# Form elements to remove with content
+_FORM_TAGS = cython.declare(frozenset, frozenset({'form', 'input', 'button', 'textarea', 'select', 'option', 'label', 'fieldset', 'legend', 'datalist', 'output', 'optgroup'}))
+
+# Form elements that are self-closing
+_SELF_CLOSING_FORM_TAGS = cython.declare(frozenset, frozenset({'input'}))
+
+# Navigation and structural elements to remove with content
+_NAV_TAGS = cython.declare(frozenset, frozenset({'nav', 'header', 'footer'}))
+
+# Metadata tags to remove (self-closing or with content)
+_METADATA_TAGS = cython.declare(frozenset, frozenset({'meta', 'base', 'link'}))
+
+# Tags to unwrap (remove tag but keep inner content)
+_UNWRAP_TAGS = cython.declare(frozenset, frozenset({'a', 'span'}))
+
+# Tags that are dropped when they have no content
+_REMOVABLE_EMPTY_TAGS = cython.declare(frozenset, frozenset(REMOVABLE_EMPTY_TAGS))
+
+# What HTMLCleaner does with each tag; tags not listed are emitted (_EMIT)
+_EMIT = 0
+_SKIP_WITH_CONTENT = 1  # remove the tag and everything inside it
+_DROP = 2  # remove the tag, which has no content
+_UNWRAP = 3  # remove the tag but keep its content
+
+_TAG_ACTIONS = cython.declare(dict, {
+    **{tag: _SKIP_WITH_CONTENT
+       for tag in _REMOVE_WITH_CONTENT | _FORM_TAGS | _NAV_TAGS | _MEDIA_TAGS_WITH_CONTENT},
+    **{tag: _DROP for tag in _SELF_CLOSING_MEDIA_TAGS | _SELF_CLOSING_FORM_TAGS | _METADATA_TAGS},
+    **{tag: _UNWRAP for tag in _UNWRAP_TAGS},
+})
+
+# Attributes removed by name: style and href, and class and id (optional -
+# can be kept if needed for semantic meaning)
+_DROP_ATTRS = cython.declare(frozenset, frozenset({'style', 'href', 'class', 'id'}))
+
+# Attributes removed by prefix: event handlers (onclick, onload, etc.), data-*
+# attributes and aria-* attributes (accessibility, not needed for data extraction)
+_DROP_ATTR_PREFIXES = cython.declare(tuple, ('on', 'data-', 'aria-'))
+
+# Keep/drop decision per attribute name, filled in by _keep_attr. Pages reuse
+# a handful of attribute names, so after warm-up filtering is a dict lookup.
+# The size cap keeps inputs with endless distinct names from growing it.
+_ATTR_KEEP_CACHE = cython.declare(dict, {})
+_ATTR_KEEP_CACHE_SIZE = 4096
+
+# '<tag>' and '</tag>' strings by tag name, so that the common attribute-free
+# tags are not formatted again for every occurrence
+_START_TAG_STRINGS = cython.declare(dict, {})
+_END_TAG_STRINGS = cython.declare(dict, {})
+_TAG_STRING_CACHE_SIZE = 4096
+
+
+@cython.locals(attr=str, keep=cython.bint)
+def _keep_attr(attr):
+    """Decide whether an attribute is kept, caching the result by name."""
+    # Exact names are a single hash probe; the prefixes are checked together
+    # by one startswith call
+    keep = not (attr in _DROP_ATTRS or attr.startswith(_DROP_ATTR_PREFIXES))
+    if len(_ATTR_KEEP_CACHE) < _ATTR_KEEP_CACHE_SIZE:
+        _ATTR_KEEP_CACHE[attr] = keep
+    return keep
 
 
 class HTMLCleaner(HTMLParser):
     """HTML Parser that removes unwanted tags and attributes."""
     
-    # Media tags that are self-closing
-    SELF_CLOSING_MEDIA_TAGS = {'img', 'source', 'track', 'embed'}
-    
-    # Media tags that typically have content (not self-closing)
-    MEDIA_TAGS_WITH_CONTENT = {'video', 'audio', 'iframe', 'object', 'svg', 'canvas'}
-    
-    # Media tags to remove (both self-closing and with content)
-    MEDIA_TAGS = SELF_CLOSING_MEDIA_TAGS | MEDIA_TAGS_WITH_CONTENT
-    
-    # Tags that should be removed along with their content
-    REMOVE_WITH_CONTENT = {'style', 'script', 'noscript'}
-    
-    # Form elements to remove with content
-    FORM_TAGS = {'form', 'input', 'button', 'textarea', 'select', 'option', 'label', 'fieldset', 'legend', 'datalist', 'output', 'optgroup'}
-    
-    # Navigation and structural elements to remove with content
-    NAV_TAGS = {'nav', 'header', 'footer'}
-    
-    # Metadata tags to remove (self-closing or with content)
-    METADATA_TAGS = {'meta', 'base', 'link'}
-    
-    # Tags to unwrap (remove tag but keep inner content)
-    UNWRAP_TAGS = {'a', 'span'}
+    SELF_CLOSING_MEDIA_TAGS = _SELF_CLOSING_MEDIA_TAGS
+    MEDIA_TAGS_WITH_CONTENT = _MEDIA_TAGS_WITH_CONTENT
+    MEDIA_TAGS = _MEDIA_TAGS
+    REMOVE_WITH_CONTENT = _REMOVE_WITH_CONTENT
+    FORM_TAGS = _FORM_TAGS
+    SELF_CLOSING_FORM_TAGS = _SELF_CLOSING_FORM_TAGS
+    NAV_TAGS = _NAV_TAGS
+    METADATA_TAGS = _METADATA_TAGS
+    UNWRAP_TAGS = _UNWRAP_TAGS
     
     def __init__(self):
         super().__init__()
-        self.output = []
-        self.skip_content = False
-        self.current_skip_tag = None
-        self.skip_media_content = False
-        self.current_media_tag = None
-        self.skip_form_content = False
-        self.current_form_tag = None
-        self.skip_nav_content = False
-        self.current_nav_tag = None
+        self.output = io.StringIO()
+        # Element being removed with its content, and how many elements of
+        # that name are open inside the removed region (0 when not skipping)
+        self.skip_tag = None
+        self.skip_depth = 0
         self.in_head = False
         self.in_title = False
+        # Opened tags not yet closed, as (tag, whether the opening tag was emitted)
+        self.open_tags = []
+        # Removable tags with no content so far, as (tag, index into
+        # pending_output), and the output held back since the first of them
+        self.empty_candidates = []
+        self.pending_output = []
     
-    def _is_stylesheet_link(self, tag, attrs):
-        """Check if a link tag is a stylesheet link."""
-        if tag == 'link':
-            for attr, value in attrs:
-                if attr == 'rel' and value == 'stylesheet':
-                    return True
-        return False
+    def _emit(self, text):
+        """Emit content, keeping any held-back tags since they are not empty."""
+        if self.empty_candidates:
+            self.output.write(''.join(self.pending_output))
+            self.pending_output.clear()
+            self.empty_candidates.clear()
+        self.output.write(text)
     
-    def _has_hidden_attribute(self, attrs):
-        """Check if element has hidden attributes."""
-        for attr, value in attrs:
-            if attr == 'hidden':
-                return True
-            if attr == 'aria-hidden' and value == 'true':
-                return True
-            if attr == 'type' and value == 'hidden':
-                return True
-        return False
+    def _emit_whitespace(self, text):
+        """Emit whitespace, which does not count as content of held-back tags."""
+        if self.empty_candidates:
+            self.pending_output.append(text)
+        else:
+            self.output.write(text)
     
-    def _clean_attributes(self, attrs):
-        """Clean attributes by removing style, href, and noisy attributes."""
+    @staticmethod
+    @cython.locals(attr=str, cleaned_attrs=list)
+    def _clean_visible_attributes(attrs):
+        """Clean attributes in one pass, or return None if the element is hidden."""
+        cache = _ATTR_KEEP_CACHE
         cleaned_attrs = []
         for attr, value in attrs:
-            # Remove style attributes
-            if attr == 'style':
-                continue
-            # Remove href attributes
-            if attr == 'href':
-                continue
-            # Remove class and id attributes (optional - can be kept if needed for semantic meaning)
-            if attr in ('class', 'id'):
-                continue
-            # Remove event handler attributes (onclick, onload, etc.)
-            if attr.startswith('on'):
-                continue
-            # Remove data attributes (data-*)
-            if attr.startswith('data-'):
-                continue
-            # Remove aria attributes (accessibility, not needed for data extraction)
-            if attr.startswith('aria-'):
-                continue
-            # Keep all other attributes
-            cleaned_attrs.append((attr, value))
+            # Hidden check first: aria-hidden itself is a dropped attribute
+            if (attr == 'hidden' or
+                    (attr == 'aria-hidden' and value == 'true') or
+                    (attr == 'type' and value == 'hidden')):
+                return None
+            if cache[attr] if attr in cache else _keep_attr(attr):
+                cleaned_attrs.append((attr, value))
         return cleaned_attrs
     
     def _build_tag_string(self, tag, attrs, self_closing=False):
         """Build an HTML tag string with properly escaped attributes."""
         if attrs:
-            attrs_str = ' '.join(
-                f'{attr}="{html.escape("" if value is None else str(value), quote=True)}"'
+            # A list, not a generator: join would build the list from it anyway
+            attrs_str = ' '.join([
+                f'{attr}="{"" if value is None else html.escape(value, quote=True)}"'
                 for attr, value in attrs
-            )
+            ])
             if self_closing:
                 return f'<{tag} {attrs_str}/>'
             else:
@@ -124,6 +265,41 @@ class HTMLCleaner(HTMLParser):
             else:
                 return f'<{tag}>'
     
+    @cython.locals(tag=str, attrs=list, self_closing=cython.bint)
+    def _emit_tag(self, tag, attrs, self_closing):
+        """Emit a kept start or self-closing tag with cleaned attributes."""
+        if attrs:
+            # Clean attributes, skipping elements with hidden attributes and
+            # remembering open ones so their closing tag is dropped too
+            cleaned_attrs = self._clean_visible_attributes(attrs)
+            if cleaned_attrs is None:
+                if not self_closing:
+                    self.open_tags.append((tag, False))
+                return
+            tag_string = self._build_tag_string(tag, cleaned_attrs, self_closing)
+        elif self_closing:
+            tag_string = f'<{tag}/>'
+        else:
+            # Attribute-free start tags are reused instead of rebuilt
+            tag_string = _START_TAG_STRINGS.get(tag)
+            if tag_string is None:
+                tag_string = f'<{tag}>'
+                if len(_START_TAG_STRINGS) < _TAG_STRING_CACHE_SIZE:
+                    _START_TAG_STRINGS[tag] = tag_string
+        
+        if self_closing:
+            self._emit(tag_string)
+            return
+        self.open_tags.append((tag, True))
+        
+        # Hold back removable tags until we know whether they have content
+        if tag in _REMOVABLE_EMPTY_TAGS:
+            self.empty_candidates.append((tag, len(self.pending_output)))
+            self.pending_output.append(tag_string)
+        else:
+            self._emit(tag_string)
+    
+    @cython.locals(tag=str, attrs=list)
     def handle_starttag(self, tag, attrs):
         """Handle opening tags."""
         # Track if we're in the head section
@@ -134,51 +310,31 @@ class HTMLCleaner(HTMLParser):
         if tag == 'title':
             self.in_title = True
         
-        # Skip script, style, and noscript tags completely
-        if tag in self.REMOVE_WITH_CONTENT:
-            self.skip_content = True
-            self.current_skip_tag = tag
+        # Skip tags inside removed elements. Only elements with the same name
+        # as the removed one nest, so a <select> is left at its </select>
+        # even if the <option> tags inside it are never closed.
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth += 1
             return
         
-        # Skip form elements completely
-        if tag in self.FORM_TAGS:
-            self.skip_form_content = True
-            self.current_form_tag = tag
-            return
+        action = _TAG_ACTIONS.get(tag, _EMIT)
         
-        # Skip navigation elements completely
-        if tag in self.NAV_TAGS:
-            self.skip_nav_content = True
-            self.current_nav_tag = tag
+        # Skip script, style, form, navigation and media elements completely
+        if action == _SKIP_WITH_CONTENT:
+            self.skip_tag = tag
+            self.skip_depth = 1
             return
         
-        # Skip media tags - if they have content, track to skip it
-        if tag in self.MEDIA_TAGS:
-            if tag in self.MEDIA_TAGS_WITH_CONTENT:
-                self.skip_media_content = True
-                self.current_media_tag = tag
+        # Skip self-closing media, form and metadata tags (including
+        # stylesheet links), and unwrap anchor and span tags (keep content
+        # but remove the tag itself)
+        if action:
             return
         
-        # Skip metadata tags (except title which we handle above)
-        if tag in self.METADATA_TAGS:
-            return
-        
-        # Skip link tags with rel="stylesheet"
-        if self._is_stylesheet_link(tag, attrs):
-            return
-        
-        # Skip elements with hidden attributes
-        if self._has_hidden_attribute(attrs):
-            return
-        
-        # Unwrap anchor tags (keep content but remove the tag itself)
-        if tag in self.UNWRAP_TAGS:
-            return
-        
-        # Clean attributes and build the tag
-        cleaned_attrs = self._clean_attributes(attrs)
-        self.output.append(self._build_tag_string(tag, cleaned_attrs))
+        self._emit_tag(tag, attrs, False)
     
+    @cython.locals(tag=str)
     def handle_endtag(self, tag):
         """Handle closing tags."""
         # Track leaving head section
@@ -189,51 +345,58 @@ class HTMLCleaner(HTMLParser):
         if tag == 'title':
             self.in_title = False
         
-        # Stop skipping content after closing tag
-        if self.skip_content and tag == self.current_skip_tag:
-            self.skip_content = False
-            self.current_skip_tag = None
+        # Stop skipping content after the removed element's closing tag, and
+        # skip all other end tags inside it
+        if self.skip_depth:
+            if tag == self.skip_tag:
+                self.skip_depth -= 1
             return
         
-        # Stop skipping form content after closing tag
-        if self.skip_form_content and tag == self.current_form_tag:
-            self.skip_form_content = False
-            self.current_form_tag = None
+        # Skip end tags for removed and unwrapped tags
+        if tag in _TAG_ACTIONS:
             return
         
-        # Stop skipping navigation content after closing tag
-        if self.skip_nav_content and tag == self.current_nav_tag:
-            self.skip_nav_content = False
-            self.current_nav_tag = None
+        # Find the matching opening tag, skipping orphaned closing tags
+        open_tags = self.open_tags
+        index = len(open_tags) - 1
+        while index >= 0 and open_tags[index][0] != tag:
+            index -= 1
+        if index < 0:
             return
+        emitted = open_tags[index][1]
+        del open_tags[index:]
         
-        # Stop skipping media content after closing tag
-        if self.skip_media_content and tag == self.current_media_tag:
-            self.skip_media_content = False
-            self.current_media_tag = None
+        # Skip end tags whose opening tag was removed
+        if not emitted:
             return
         
-        # Skip end tags for removed tags
-        if tag in self.REMOVE_WITH_CONTENT or tag in self.MEDIA_TAGS or tag in self.FORM_TAGS or tag in self.NAV_TAGS or tag in self.METADATA_TAGS:
+        # Drop empty removable tags together with their opening tag
+        if self.empty_candidates and self.empty_candidates[-1][0] == tag:
+            del self.pending_output[self.empty_candidates.pop()[1]:]
             return
         
-        # Skip end tags for unwrapped tags
-        if tag in self.UNWRAP_TAGS:
-            return
-        
-        self.output.append(f'</{tag}>')
+        tag_string = _END_TAG_STRINGS.get(tag)
+        if tag_string is None:
+            tag_string = f'</{tag}>'
+            if len(_END_TAG_STRINGS) < _TAG_STRING_CACHE_SIZE:
+                _END_TAG_STRINGS[tag] = tag_string
+        self._emit(tag_string)
     
+    @cython.locals(data=str)
     def handle_data(self, data):
         """Handle text content."""
-        # Skip content if we're in any skip mode
-        if self.skip_content or self.skip_media_content or self.skip_form_content or self.skip_nav_content:
+        # Skip content inside removed elements
+        if self.skip_depth:
             return
         
         # Skip data in head section (except title)
         if self.in_head and not self.in_title:
             return
         
-        self.output.append(data)
+        if not data or data.isspace():
+            self._emit_whitespace(data)
+        else:
+            self._emit(data)
     
     def handle_comment(self, data):
         """Handle HTML comments - remove all comments to reduce noise."""
@@ -242,132 +405,341 @@ class HTMLCleaner(HTMLParser):
     
     def handle_decl(self, decl):
         """Handle DOCTYPE declarations."""
-        self.output.append(f'<!{decl}>')
+        self._emit(f'<!{decl}>')
     
+    @cython.locals(tag=str, attrs=list)
     def handle_startendtag(self, tag, attrs):
         """Handle self-closing tags."""
-        # Skip media tags
-        if tag in self.MEDIA_TAGS:
-            return
-        
-        # Skip form elements
-        if tag in self.FORM_TAGS:
+        # Skip tags inside removed elements, and removed or unwrapped tags
+        if self.skip_depth or tag in _TAG_ACTIONS:
             return
         
-        # Skip metadata tags
-        if tag in self.METADATA_TAGS:
-            return
-        
-        # Skip link tags with rel="stylesheet"
-        if self._is_stylesheet_link(tag, attrs):
-            return
-        
-        # Skip elements with hidden attributes
-        if self._has_hidden_attribute(attrs):
-            return
-        
-        # Clean attributes and build the self-closing tag
-        cleaned_attrs = self._clean_attributes(attrs)
-        self.output.append(self._build_tag_string(tag, cleaned_attrs, self_closing=True))
+        self._emit_tag(tag, attrs, True)
     
     def get_output(self):
-        """Return the cleaned HTML."""
-        return ''.join(self.output)
+        """Return the cleaned HTML, with empty removable tags dropped."""
+        return self.output.getvalue() + ''.join(self.pending_output)
+    
+    def take_output(self):
+        """
+        Return the cleaned HTML emitted since the last call and clear it.
+        
+        Tags held back as possibly empty are not included yet; after close(),
+        get_output() returns whatever remains.
+        """
+        text = self.output.getvalue()
+        self.output.seek(0)
+        self.output.truncate()
+        return text
 
 
 def remove_empty_tags(html_content):
     """
     Remove empty HTML tags recursively until no more can be removed.
     
+    This is a standalone utility for already-formatted HTML; it is not used by
+    clean_html, since both backends prune empty tags while cleaning.
+    
     Args:
         html_content (str): HTML content to clean
         
     Returns:
         str: HTML content with empty tags removed
     """
-    import re
-    
-    # Tags that should be removed if empty
-    # Keep structural tags like html, head, body even if empty
-    removable_tags = ['div', 'span', 'p', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                     'section', 'article', 'aside', 'main', 'figure', 'figcaption',
-                     'strong', 'em', 'b', 'i', 'u', 'small', 'mark', 'del', 'ins',
-                     'sub', 'sup', 'blockquote', 'pre', 'code', 'kbd', 'samp', 'var',
-                     'abbr', 'address', 'cite', 'dfn', 'time', 'dd', 'dt', 'dl']
-    
-    # Keep running until no more changes
-    max_iterations = 50  # Prevent infinite loops
-    iteration = 0
-    
-    while iteration < max_iterations:
-        original = html_content
-        
+    # Keep running until no more changes (every change shortens the content)
+    while True:
         # Remove tags that are completely empty: <tag></tag> or <tag> </tag> or <tag>\n</tag>
-        for tag in removable_tags:
-            # Match opening tag, optional whitespace, closing tag
-            pattern = rf'<{tag}[^>]*>\s*</{tag}>'
-            html_content = re.sub(pattern, '', html_content)
+        new_content = _EMPTY_TAG_RE.sub('', html_content)
         
         # Remove orphaned closing tags more simply
         # Just remove any remaining closing tags that are surrounded by whitespace/newlines
         # This is a simpler approach that catches most orphaned tags
-        pattern = r'^\s*</[^>]+>\s*$'
-        html_content = re.sub(pattern, '', html_content, flags=re.MULTILINE)
+        new_content = _ORPHAN_CLOSING_TAG_RE.sub('', new_content)
         
         # If nothing changed, we're done
-        if html_content == original:
-            break
+        if new_content == html_content:
+            return html_content
+        html_content = new_content
+
+
+def format_html(html_content):
+    """
+    Format cleaned HTML for readability in a single pass.
+    
+    Puts each tag on its own line when text follows or precedes it, removes
+    blank lines and consolidates multiple spaces into a single space.
+    
+    Args:
+        html_content (str): HTML content to format
         
-        iteration += 1
+    Returns:
+        str: Formatted HTML content
+    """
+    lines = filter(None, _LINE_RE.findall(html_content))
+    return _MULTIPLE_SPACES_RE.sub(' ', '\n'.join(lines))
+
+
+def _format_html_chunks(chunks):
+    """
+    Like format_html, but for HTML arriving in chunks. Yields pieces whose
+    concatenation equals format_html(''.join(chunks)).
+    """
+    # No format_html match spans a newline, so text up to the last newline
+    # formats the same on its own as it does within the whole document
+    pending = []
+    separator = ''
+    for chunk in chunks:
+        cut = chunk.rfind('\n') + 1
+        if not cut:
+            pending.append(chunk)
+            continue
+        pending.append(chunk[:cut])
+        formatted = format_html(''.join(pending))
+        pending = [chunk[cut:]]
+        if formatted:
+            yield separator + formatted
+            separator = '\n'
+    formatted = format_html(''.join(pending))
+    if formatted:
+        yield separator + formatted
+
+
+def clean_html_lxml(html_content):
+    """
+    Clean HTML content using lxml (libxml2) instead of html.parser.
+    
+    Applies the same removals as HTMLCleaner, but on a parsed tree so that
+    whole subtrees are dropped in C rather than event by event in Python.
+    Empty tags are pruned from the tree, so remove_empty_tags is not needed.
+    
+    Args:
+        html_content (str): HTML content to clean
+        
+    Returns:
+        str: Cleaned HTML content
+    """
+    return _clean_html_lxml_chunks([html_content])
+
+
+def _clean_html_lxml_chunks(chunks):
+    """
+    Like clean_html_lxml, but parse the HTML incrementally from an iterable of
+    str chunks.
+    """
+    # Plain etree elements: lxml.html's element classes cost a Python lookup per node
+    parser = etree.HTMLParser()
+    start = ''
+    prefix_end = 0
+    sniffing = True
+    for chunk in chunks:
+        # Keep the start of the document to tell documents from fragments,
+        # until it reaches the first tag after any leading comments. Only the
+        # text after the prefix matched so far is scanned again.
+        if sniffing:
+            start += chunk
+            prefix_end = _DOCUMENT_PREFIX_RE.match(start, prefix_end).end()
+            rest = start[prefix_end:prefix_end + len('<!doctype')]
+            sniffing = ((len(rest) < len('<!doctype') or rest.startswith('<!--')) and
+                        len(start) < _DOCUMENT_START_LIMIT)
+        parser.feed(chunk)
+    
+    # Whitespace-only input; longer input than the limit is left to the parser
+    if not start.strip() and len(start) < _DOCUMENT_START_LIMIT:
+        return ''
+    root = parser.close()
+    if root is None:
+        return ''
+    
+    # Drop comments and removed tags together with their content
+    etree.strip_elements(
+        root, etree.Comment, etree.ProcessingInstruction,
+        *(HTMLCleaner.REMOVE_WITH_CONTENT | HTMLCleaner.MEDIA_TAGS_WITH_CONTENT |
+          HTMLCleaner.FORM_TAGS | HTMLCleaner.NAV_TAGS),
+        with_tail=False)
+    
+    # Self-closing tags are only unwrapped: libxml2 does not know all of them
+    # (e.g. embed, track) and nests the following siblings inside them
+    etree.strip_tags(root, *(HTMLCleaner.SELF_CLOSING_MEDIA_TAGS | HTMLCleaner.METADATA_TAGS))
+    
+    # Clean attributes and mark hidden elements, in a single walk of the tree
+    for element in root.iter():
+        items = element.items()
+        if items:
+            cleaned_attrs = HTMLCleaner._clean_visible_attributes(items)
+            if cleaned_attrs is None:
+                if element is root:
+                    # strip_tags cannot unwrap the root; drop its attributes instead
+                    element.attrib.clear()
+                else:
+                    element.tag = _LXML_UNWRAP_MARKER
+            elif len(cleaned_attrs) != len(items):
+                kept = {attr for attr, value in cleaned_attrs}
+                attrib = element.attrib
+                for attr, value in items:
+                    if attr not in kept:
+                        del attrib[attr]
+    
+    # Unwrap hidden elements and anchor/span tags (keep content, drop the tag)
+    etree.strip_tags(root, _LXML_UNWRAP_MARKER, *HTMLCleaner.UNWRAP_TAGS)
+    
+    # Remove empty tags, children before parents so emptied parents go too
+    for element in reversed(list(root.iter(*REMOVABLE_EMPTY_TAGS))):
+        if element.text and element.text.strip():
+            continue
+        if all(child.tag == _LXML_DROP_MARKER and not (child.tail and child.tail.strip())
+               for child in element):
+            element.tag = _LXML_DROP_MARKER
+    etree.strip_elements(root, _LXML_DROP_MARKER, with_tail=False)
+    
+    # Serialize: whole document if the input was one, otherwise just the fragment
+    if _DOCUMENT_TAG_RE.match(start, prefix_end):
+        cleaned_html = etree.tostring(root, encoding='unicode', method='html')
+        doctype = root.getroottree().docinfo.doctype
+        if doctype and _DOCTYPE_RE.match(start, prefix_end):
+            cleaned_html = f'{doctype}\n{cleaned_html}'
+        return cleaned_html
+    
+    parts = []
+    for container in root:
+        if container.text:
+            parts.append(container.text)
+        parts.extend(etree.tostring(child, encoding='unicode', method='html') for child in container)
+    return ''.join(parts)
+
+
+def _clean_html_chunks(chunks):
+    """Clean HTML with HTMLCleaner, yielding the output as each chunk is parsed."""
+    cleaner = HTMLCleaner()
+    for chunk in chunks:
+        cleaner.feed(chunk)
+        yield cleaner.take_output()
+    cleaner.close()
+    yield cleaner.get_output()
+
+
+def clean_html_stream(in_fp, out_fp, chunk_size=CHUNK_SIZE):
+    """
+    Clean HTML read from one file object and write it to another.
+    
+    The input is read and parsed chunk by chunk. Without lxml the cleaned and
+    formatted output is also written as it is produced, so memory use does not
+    grow with the size of the document.
+    
+    Binary input is decoded as UTF-8 before either backend sees it, with a
+    leading byte order mark dropped and invalid bytes replaced by U+FFFD, so
+    both backends get the same text rather than failing part-way through.
+    
+    Args:
+        in_fp: File object to read HTML from, in text mode or in binary mode
+            for UTF-8 encoded input
+        out_fp: Text file object to write the cleaned HTML to
+        chunk_size (int): Number of characters or bytes to read at a time
+    """
+    # read(0) returns '' or b'', which tells text and binary input apart
+    end = in_fp.read(0)
+    chunks = iter(lambda: in_fp.read(chunk_size), end)
+    if isinstance(end, bytes):
+        chunks = codecs.iterdecode(chunks, 'utf-8-sig', 'replace')
+    
+    # Add basic formatting: put each tag on its own line for readability
+    # This makes it easier for AI to parse while keeping it clean
+    if lxml_html is not None:
+        out_fp.write(format_html(_clean_html_lxml_chunks(chunks)))
+    else:
+        out_fp.writelines(_format_html_chunks(_clean_html_chunks(chunks)))
+
+
+def _open_temp_file(target):
+    """
+    Create a temporary file next to target, to be moved onto it once written.
+    
+    The file gets target's permissions if target exists, otherwise those a
+    new file would get from open().
+    
+    Args:
+        target (str): Resolved path of the regular or missing output file
+        
+    Returns:
+        tuple: (temporary path, text file object), or (None, None) if the
+            directory is not writable
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = None
     
-    return html_content
+    directory = os.path.dirname(target)
+    while True:
+        tmp_path = os.path.join(directory, f'.html-cleaner-{os.urandom(6).hex()}.tmp')
+        try:
+            # 0o666 less the umask, as open() does, without changing the umask
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        except FileExistsError:
+            continue
+        except PermissionError:
+            return None, None
+        break
+    
+    try:
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        return tmp_path, open(fd, 'w', encoding='utf-8')
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
 
 
 def clean_html(input_file, output_file):
     """
     Clean HTML from input file and write to output file.
     
+    A regular or new output file is written through a temporary file next to
+    it and moved into place only once cleaning succeeds, so an error never
+    leaves a partial output file and the output may be the input file itself.
+    Other outputs (FIFOs, devices) and outputs in directories that are not
+    writable are written directly. The input is decoded as in
+    clean_html_stream.
+    
     Args:
-        input_file (str): Path to input HTML file
-        output_file (str): Path to output HTML file
+        input_file (str): Path to input HTML file, or '-' for standard input
+        output_file (str): Path to output HTML file, or '-' for standard output
     """
+    tmp_path = None
     try:
-        # Read input HTML
-        with open(input_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        # Clean the HTML
-        cleaner = HTMLCleaner()
-        cleaner.feed(html_content)
-        cleaned_html = cleaner.get_output()
-        
-        # Post-processing: Remove empty tags
-        cleaned_html = remove_empty_tags(cleaned_html)
-        
-        # Remove blank lines
-        lines = cleaned_html.splitlines()
-        non_blank_lines = [line for line in lines if line.strip()]
-        cleaned_html = '\n'.join(non_blank_lines)
-        
-        # Consolidate multiple spaces into single space (preserve line structure)
-        import re
-        cleaned_html = re.sub(r' +', ' ', cleaned_html)
-        
-        # Add basic formatting: put each tag on its own line for readability
-        # This makes it easier for AI to parse while keeping it clean
-        cleaned_html = re.sub(r'>([^<\n])', r'>\n\1', cleaned_html)  # Newline after > if text follows
-        cleaned_html = re.sub(r'([^>\n])<', r'\1\n<', cleaned_html)  # Newline before < if text precedes
-        
-        # Remove any resulting blank lines again
-        lines = cleaned_html.splitlines()
-        non_blank_lines = [line for line in lines if line.strip()]
-        cleaned_html = '\n'.join(non_blank_lines)
-        
-        # Write output HTML
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(cleaned_html)
-        
-        print(f"Successfully cleaned HTML from '{input_file}' to '{output_file}'")
+        with contextlib.ExitStack() as stack:
+            if input_file == '-':
+                in_fp = sys.stdin.buffer
+            else:
+                in_fp = stack.enter_context(open(input_file, 'rb'))
+            
+            if output_file == '-':
+                out_fp = sys.stdout
+            else:
+                # Follow symlinks so the link stays and its target is replaced
+                target = os.path.realpath(output_file)
+                out_fp = None
+                try:
+                    is_regular = stat.S_ISREG(os.stat(target).st_mode)
+                except FileNotFoundError:
+                    is_regular = True
+                if is_regular:
+                    tmp_path, out_fp = _open_temp_file(target)
+                if out_fp is None:
+                    if input_file != '-' and os.path.exists(target) and os.path.samefile(input_file, target):
+                        raise ValueError(f"Cannot clean '{input_file}' in place: its directory is not writable")
+                    out_fp = open(output_file, 'w', encoding='utf-8')
+                stack.enter_context(out_fp)
+            
+            clean_html_stream(in_fp, out_fp)
+        
+        if tmp_path is not None:
+            os.replace(tmp_path, target)
+            tmp_path = None
+        
+        # Keep standard output for the cleaned HTML when writing it there
+        status_fp = sys.stderr if output_file == '-' else sys.stdout
+        print(f"Successfully cleaned HTML from '{input_file}' to '{output_file}'", file=status_fp)
         return True
     
     except FileNotFoundError as e:
@@ -376,9 +748,81 @@ def clean_html(input_file, output_file):
     except Exception as e:
         sys.stderr.write(f"Error: {e}\n")
         return False
+    finally:
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
 
 
-if __name__ == "__main__":
+def _clean_one(paths):
+    """Clean one (input_file, output_file) pair; used by clean_many's worker processes."""
+    return clean_html(*paths)
+
+
+def clean_many(pairs, workers=None):
+    """
+    Clean many HTML files in parallel worker processes.
+    
+    Parsing is CPU-bound Python code that holds the GIL, so each file is
+    cleaned in a separate process rather than a thread.
+    
+    Args:
+        pairs (list): (input_file, output_file) path pairs
+        workers (int): Number of worker processes, defaults to the CPU count
+        
+    Returns:
+        list: clean_html's result (True or False) for each pair, in order
+    """
+    pairs = list(pairs)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(pairs) <= 1:
+        return [_clean_one(paths) for paths in pairs]
+    
+    # Hand out several small files per task, but keep enough tasks to
+    # balance workers when file sizes vary
+    chunksize = max(1, min(16, len(pairs) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_clean_one, pairs, chunksize=chunksize))
+
+
+def _batch_pairs(pattern, output_dir):
+    """
+    Map the files matching a glob pattern to paths under output_dir.
+    
+    Raises:
+        ValueError: If output_dir contains one of the matched files, or an
+            output path resolves to one
+    """
+    input_files = sorted(path for path in glob.glob(pattern, recursive=True)
+                         if os.path.isfile(path))
+    if not input_files:
+        return []
+    
+    # Keep paths relative to the matches' common directory, so files with the
+    # same name in different directories do not overwrite each other
+    base_dir = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in input_files])
+    pairs = [(path, os.path.join(output_dir, os.path.relpath(os.path.abspath(path), base_dir)))
+             for path in input_files]
+    
+    # Refuse an output directory holding any of the matches (such as the
+    # outputs of an earlier run), or any output that lands on a match
+    real_inputs = {os.path.realpath(path): path for path in input_files}
+    real_output_dir = os.path.join(os.path.realpath(output_dir), '')
+    for real_path, path in real_inputs.items():
+        if real_path.startswith(real_output_dir):
+            raise ValueError(f"Output directory '{output_dir}' contains input '{path}'")
+    for path, output_file in pairs:
+        real_output = os.path.realpath(output_file)
+        if real_output in real_inputs:
+            raise ValueError(f"Output '{output_file}' would overwrite input '{real_inputs[real_output]}'")
+    
+    for path, output_file in pairs:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    return pairs
+
+
+def main():
+    """Command-line entry point."""
     # Default input and output files
     input_file = "input.html"
     output_file = "output.html"
@@ -389,6 +833,26 @@ if __name__ == "__main__":
     if len(sys.argv) >= 3:
         output_file = sys.argv[2]
     
+    # A glob pattern cleans every matching file, in parallel, into an output
+    # directory (default "cleaned"); an existing file is never a pattern, even
+    # if its name contains [, * or ?
+    if not os.path.exists(input_file) and glob.has_magic(input_file):
+        output_dir = sys.argv[2] if len(sys.argv) >= 3 else "cleaned"
+        try:
+            pairs = _batch_pairs(input_file, output_dir)
+        except ValueError as e:
+            sys.stderr.write(f"Error: {e}\n")
+            return 1
+        if not pairs:
+            sys.stderr.write(f"Error: No files match '{input_file}'\n")
+            return 1
+        results = clean_many(pairs)
+        return 0 if all(results) else 1
+    
     # Clean the HTML
     success = clean_html(input_file, output_file)
-    sys.exit(0 if success else 1)
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Build script for HTML Cleaner.
+
+If Cython is installed, html_cleaner.py is compiled to a C extension (the
+module is written in Cython's pure-Python mode). Without Cython, or if the
+extension fails to build, html_cleaner.py is installed as plain Python and
+behaves identically. Set HTML_CLEANER_NO_CYTHON=1 to skip the compiled
+extension even when Cython is installed.
+"""
+
+import os
+
+from setuptools import setup
+from setuptools.command.build_ext import build_ext
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    cythonize = None
+
+
+class OptionalBuildExt(build_ext):
+    """Build the extension if possible, otherwise fall back to pure Python."""
+
+    def run(self):
+        try:
+            super().run()
+        except Exception as e:
+            self.warn(f"Could not build the compiled extension, using pure Python: {e}")
+
+    def build_extension(self, ext):
+        try:
+            super().build_extension(ext)
+        except Exception as e:
+            self.warn(f"Could not build {ext.name}, using pure Python: {e}")
+
+
+ext_modules = []
+if cythonize is not None and not os.environ.get("HTML_CLEANER_NO_CYTHON"):
+    ext_modules = cythonize(
+        "html_cleaner.py",
+        compiler_directives={
+            "language_level": 3,
+            # Every list index in the module is checked against the list first.
+            # wraparound stays on: handle_endtag reads empty_candidates[-1].
+            "boundscheck": False,
+        },
+    )
+
+setup(
+    name="html-cleaner",
+    version="0.1.0",
+    description="Purify HTML for data extraction by removing styles, scripts, media and noise",
+    py_modules=["html_cleaner"],
+    ext_modules=ext_modules,
+    cmdclass={"build_ext": OptionalBuildExt},
+    entry_points={"console_scripts": ["html-cleaner=html_cleaner:main"]},
+    python_requires=">=3.6",
+)
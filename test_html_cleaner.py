@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Regression tests for HTML Cleaner.
+
+Run with: python3 -m unittest test_html_cleaner
+"""
+
+import contextlib
+import io
+import os
+import random
+import stat
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import html_cleaner
+from html_cleaner import HTMLCleaner, _format_html_chunks, format_html
+
+
+def clean_with_parser(html_content):
+    """Clean HTML with the pure-Python HTMLCleaner and return its raw output."""
+    cleaner = HTMLCleaner()
+    cleaner.feed(html_content)
+    cleaner.close()
+    return cleaner.get_output()
+
+
+class SkipRegionTests(unittest.TestCase):
+    """Removed elements end at their own closing tag, and only there."""
+
+    def test_unclosed_options_end_with_select(self):
+        self.assertEqual(clean_with_parser('<select><option>a<option>b</select>after'), 'after')
+
+    def test_nested_same_name_elements(self):
+        self.assertEqual(clean_with_parser('<svg><svg></svg>x</svg>y'), 'y')
+
+    def test_other_end_tags_do_not_end_removed_element(self):
+        self.assertEqual(clean_with_parser('<svg></header>x</svg>y'), 'y')
+
+
+class EmptyTagTests(unittest.TestCase):
+    """Empty removable tags are dropped while parsing; other closing tags are kept."""
+
+    def test_nested_empty_tags(self):
+        self.assertEqual(clean_with_parser('<div><p> </p></div>'), '')
+
+    def test_hidden_child(self):
+        self.assertEqual(clean_with_parser('<div><p hidden></p></div>'), '')
+
+    def test_tag_with_content_after_empty_child(self):
+        self.assertEqual(clean_with_parser('<div><p></p>x</div>'), '<div>x</div>')
+
+    def test_closing_tag_alone_on_its_line_is_kept(self):
+        cleaned = clean_with_parser('<pre>code\n</pre>')
+        self.assertEqual(cleaned, '<pre>code\n</pre>')
+        self.assertEqual(format_html(cleaned), '<pre>\ncode\n</pre>')
+
+    def test_orphan_closing_tag_is_dropped(self):
+        self.assertEqual(clean_with_parser('<p>a</p></div>'), '<p>a</p>')
+        self.assertEqual(clean_with_parser('<div>a</div></div>b'), '<div>a</div>b')
+
+
+class FormatTests(unittest.TestCase):
+    """format_html puts tags on their own lines and drops blank lines."""
+
+    def test_blank_lines_are_dropped(self):
+        self.assertEqual(format_html('<p>a</p>\n\n<div>b</div>'), '<p>\na\n</p>\n<div>\nb\n</div>')
+        self.assertEqual(format_html('a\r\n \r\nb'), 'a\nb')
+        self.assertEqual(format_html('a\x0c\x0c b'), 'a\n b')
+        self.assertEqual(format_html('a\u2028 \u2028b'), 'a\nb')
+        self.assertEqual(format_html('<p>\u2028</p>'), '<p>\n</p>')
+
+    def test_spaces_are_collapsed(self):
+        self.assertEqual(format_html('<p>a   b    c</p>'), '<p>\na b c\n</p>')
+
+    def test_text_is_split_from_tags(self):
+        self.assertEqual(format_html('<p>text'), '<p>\ntext')
+        self.assertEqual(format_html('text</p>'), 'text\n</p>')
+        self.assertEqual(format_html('<b>x</b>tail<i>y</i>'), '<b>\nx\n</b>\ntail\n<i>\ny\n</i>')
+        self.assertEqual(format_html('<p><b>x</b></p>'), '<p><b>\nx\n</b></p>')
+
+    def test_chunks_format_like_whole_document(self):
+        rng = random.Random(0)
+        pieces = ['<p>', '</p>', '<b class="x">', 'text', ' ', '  ', '\n', '\r\n', '\x0c', '\u2028', '>', '<', 'a b']
+        for _ in range(500):
+            html_content = ''.join(rng.choice(pieces) for _ in range(rng.randrange(30)))
+            cuts = sorted(rng.sample(range(len(html_content) + 1), min(len(html_content) + 1, rng.randrange(6))))
+            parts = [html_content[i:j] for i, j in zip([0] + cuts, cuts + [len(html_content)])]
+            self.assertEqual(''.join(_format_html_chunks(parts)), format_html(''.join(parts)), parts)
+
+
+@unittest.skipIf(html_cleaner.lxml_html is None, 'lxml is not installed')
+class LxmlDocumentTests(unittest.TestCase):
+    """The lxml backend keeps the document structure of full documents."""
+
+    def test_leading_byte_order_mark_and_comment(self):
+        cleaned = html_cleaner.clean_html_lxml('\ufeff<!-- c --><!DOCTYPE html><html><body><p>x</p></body></html>')
+        self.assertTrue(cleaned.startswith('<!DOCTYPE html>\n<html>'))
+
+    def test_bare_body(self):
+        self.assertEqual(html_cleaner.clean_html_lxml('<body><p>x</p></body>'), '<html><body><p>x</p></body></html>')
+
+    def test_comment_split_across_chunks(self):
+        chunks = ['<!-- a long', ' comment --', '><html><body><p>x</p></body></html>']
+        self.assertEqual(html_cleaner._clean_html_lxml_chunks(iter(chunks)), '<html><body><p>x</p></body></html>')
+
+    def test_unclosed_leading_comment_is_a_fragment(self):
+        chunks = ['<!-- ' + 'x' * 1024] * 1024
+        self.assertEqual(html_cleaner._clean_html_lxml_chunks(iter(chunks)), '')
+
+    def test_hidden_root(self):
+        for attrs in ('hidden', 'aria-hidden="true"'):
+            cleaned = html_cleaner.clean_html_lxml(f'<html {attrs} lang="en"><body><p>x</p></body></html>')
+            self.assertEqual(cleaned, '<html><body><p>x</p></body></html>')
+
+    def test_fragment(self):
+        self.assertEqual(html_cleaner.clean_html_lxml('<p>x</p>'), '<p>x</p>')
+
+
+class DecodingTests(unittest.TestCase):
+    """Binary input is decoded the same way for both backends."""
+
+    def clean_stream(self, data):
+        out_fp = io.StringIO()
+        html_cleaner.clean_html_stream(io.BytesIO(data), out_fp)
+        return out_fp.getvalue()
+
+    def assert_both_backends(self, data, expected):
+        with mock.patch.object(html_cleaner, 'lxml_html', None):
+            self.assertEqual(self.clean_stream(data), expected)
+        if html_cleaner.lxml_html is not None:
+            self.assertEqual(self.clean_stream(data), expected)
+
+    def test_invalid_utf8(self):
+        self.assert_both_backends(b'<p>a\xe2\x82</p>', '<p>\na\ufffd\n</p>')
+        self.assert_both_backends(b'<p>a\xffb</p>', '<p>\na\ufffdb\n</p>')
+
+    def test_byte_order_mark(self):
+        self.assert_both_backends(b'\xef\xbb\xbf<p>a</p>', '<p>\na\n</p>')
+
+
+class CleanFileTests(unittest.TestCase):
+    """clean_html replaces the output only once cleaning has succeeded."""
+
+    PAGE = '<html><body><nav>menu</nav><p>Hello</p></body></html>'
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+        return path
+
+    def read(self, path):
+        with open(path, encoding='utf-8') as fp:
+            return fp.read()
+
+    def clean(self, input_file, output_file):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return html_cleaner.clean_html(input_file, output_file)
+
+    def test_in_place_without_lxml(self):
+        path = self.write('page.html', self.PAGE)
+        with mock.patch.object(html_cleaner, 'lxml_html', None):
+            self.assertTrue(self.clean(path, path))
+        self.assertIn('Hello', self.read(path))
+        self.assertNotIn('menu', self.read(path))
+
+    @unittest.skipIf(html_cleaner.lxml_html is None, 'lxml is not installed')
+    def test_in_place_with_lxml(self):
+        path = self.write('page.html', self.PAGE)
+        self.assertTrue(self.clean(path, path))
+        self.assertIn('Hello', self.read(path))
+        self.assertNotIn('menu', self.read(path))
+
+    def test_stdin_to_file(self):
+        output_file = self.write('out.html', 'previous')
+        stdin = io.TextIOWrapper(io.BytesIO(self.PAGE.encode('utf-8')), encoding='utf-8')
+        with mock.patch('sys.stdin', stdin):
+            self.assertTrue(self.clean('-', output_file))
+        self.assertIn('Hello', self.read(output_file))
+        self.assertEqual(sorted(os.listdir(self.dir)), ['out.html'])
+
+    def test_invalid_utf8_is_replaced(self):
+        input_file = os.path.join(self.dir, 'page.html')
+        with open(input_file, 'wb') as fp:
+            fp.write(b'<p>a\xffb</p>')
+        output_file = os.path.join(self.dir, 'out.html')
+        with mock.patch.object(html_cleaner, 'lxml_html', None):
+            self.assertTrue(self.clean(input_file, output_file))
+        self.assertIn('a\ufffdb', self.read(output_file))
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'symlinks are not supported')
+    def test_symlink_output_replaces_target(self):
+        input_file = self.write('page.html', self.PAGE)
+        target = self.write('target.html', 'previous')
+        link = os.path.join(self.dir, 'link.html')
+        os.symlink(target, link)
+        self.assertTrue(self.clean(input_file, link))
+        self.assertTrue(os.path.islink(link))
+        self.assertIn('Hello', self.read(target))
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'FIFOs are not supported')
+    def test_fifo_output_is_written_directly(self):
+        input_file = self.write('page.html', self.PAGE)
+        fifo = os.path.join(self.dir, 'out.fifo')
+        os.mkfifo(fifo)
+        received = []
+        reader = threading.Thread(target=lambda: received.append(self.read(fifo)))
+        reader.start()
+        self.assertTrue(self.clean(input_file, fifo))
+        reader.join()
+        self.assertTrue(stat.S_ISFIFO(os.stat(fifo).st_mode))
+        self.assertIn('Hello', received[0])
+
+    @unittest.skipIf(os.name != 'posix', 'POSIX permissions only')
+    def test_output_permissions(self):
+        input_file = self.write('page.html', self.PAGE)
+        existing = self.write('existing.html', 'previous')
+        os.chmod(existing, 0o640)
+        self.assertTrue(self.clean(input_file, existing))
+        self.assertEqual(stat.S_IMODE(os.stat(existing).st_mode), 0o640)
+
+        new = os.path.join(self.dir, 'new.html')
+        umask = os.umask(0o027)
+        try:
+            self.assertTrue(self.clean(input_file, new))
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(new).st_mode), 0o640)
+
+    @unittest.skipIf(os.name != 'posix' or os.geteuid() == 0, 'needs POSIX permissions, not root')
+    def test_output_in_read_only_directory(self):
+        input_file = self.write('page.html', self.PAGE)
+        output_file = self.write('out.html', 'previous')
+        os.chmod(self.dir, 0o555)
+        self.addCleanup(os.chmod, self.dir, 0o755)
+        self.assertTrue(self.clean(input_file, output_file))
+        self.assertIn('Hello', self.read(output_file))
+        self.assertFalse(self.clean(input_file, input_file))
+        self.assertEqual(self.read(input_file), self.PAGE)
+
+    def test_failure_keeps_existing_output(self):
+        input_file = self.write('page.html', self.PAGE)
+        output_file = self.write('out.html', 'previous')
+
+        def fail(in_fp, out_fp):
+            out_fp.write('partial')
+            raise ValueError('cleaning failed')
+
+        with mock.patch.object(html_cleaner, 'clean_html_stream', fail):
+            self.assertFalse(self.clean(input_file, output_file))
+        self.assertEqual(self.read(output_file), 'previous')
+        self.assertEqual(sorted(os.listdir(self.dir)), ['out.html', 'page.html'])
+
+
+class BatchTests(unittest.TestCase):
+    """Glob arguments are batched without ever overwriting their inputs."""
+
+    PAGE = '<p>Hello</p>'
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.dir = tmp_dir.name
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        with open('page.html', 'w', encoding='utf-8') as fp:
+            fp.write(self.PAGE)
+
+    def run_main(self, *args):
+        with mock.patch('sys.argv', ['html_cleaner.py', *args]), \
+                contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            return html_cleaner.main()
+
+    def test_glob_onto_itself_is_refused(self):
+        self.assertEqual(self.run_main('*.html', '.'), 1)
+        with open('page.html', encoding='utf-8') as fp:
+            self.assertEqual(fp.read(), self.PAGE)
+
+    def test_output_onto_other_input_is_refused(self):
+        os.makedirs(os.path.join('a', 'b'))
+        os.rename('page.html', os.path.join('a', 'x.html'))
+        with open(os.path.join('a', 'b', 'x.html'), 'w', encoding='utf-8') as fp:
+            fp.write('<p>Other</p>')
+        self.assertEqual(self.run_main('a/**/*.html', os.path.join('a', 'b')), 1)
+        with open(os.path.join('a', 'b', 'x.html'), encoding='utf-8') as fp:
+            self.assertEqual(fp.read(), '<p>Other</p>')
+
+    def test_recursive_glob_over_earlier_output_is_refused(self):
+        self.assertEqual(self.run_main('**/*.html', 'out'), 0)
+        self.assertEqual(self.run_main('**/*.html', 'out'), 1)
+
+    def test_glob_into_output_dir(self):
+        self.assertEqual(self.run_main('*.html', 'out'), 0)
+        self.assertTrue(os.path.isfile(os.path.join('out', 'page.html')))
+
+    def test_existing_file_with_glob_characters(self):
+        os.rename('page.html', 'page[1].html')
+        self.assertEqual(self.run_main('page[1].html', 'out.html'), 0)
+        with open('out.html', encoding='utf-8') as fp:
+            self.assertIn('Hello', fp.read())
+
+
+if __name__ == '__main__':
+    unittest.main()